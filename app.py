@@ -1,8 +1,5 @@
 import streamlit as st
 import traceback
-import os
-
-print("✅ Reached top of app.py")
 
 st.set_page_config(page_title="Bakery Forecasting", layout="wide")
 
@@ -12,4 +9,3 @@ try:
 except Exception as e:
     st.error("🚨 Streamlit app crashed")
     st.code(traceback.format_exc())
-    print(traceback.format_exc())
@@ -1,6 +1,108 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from types import MappingProxyType
+from functools import lru_cache
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Accepted column names for each standard column, in order of preference
+# (read-only: built once at import and shared by validate_data and preprocess_data)
+COLUMN_ALIASES = MappingProxyType({
+    'date': ('date', 'datetime', 'day', 'sale_date', 'transaction_date', 'date of sale', 'sales date'),
+    'item': ('item', 'product', 'product_name', 'item_name', 'item_type', 'product type', 'goods', 'bakery item'),
+    'quantity': ('quantity', 'qty', 'units', 'units_sold', 'quantity_sold', 'count', 'number sold', 'amount sold'),
+    'revenue': ('revenue', 'sales', 'amount', 'sales_amount', 'income', 'sales revenue', 'total sales', 'price'),
+    'cogs': ('cogs', 'cost', 'cost_of_goods_sold', 'costs', 'expense', 'expenses', 'production cost', 'cost price')
+})
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+# Inverted alias table: column name -> (standard name, preference rank)
+_ALIAS_TO_STD = MappingProxyType({alias: (std_name, rank)
+                                   for std_name, aliases in COLUMN_ALIASES.items()
+                                   for rank, alias in enumerate(aliases)})
+
+# One compiled alternation per standard column for partial (substring) matches
+_PARTIAL_PATTERNS = MappingProxyType({std_name: re.compile('|'.join(map(re.escape, aliases)))
+                                      for std_name, aliases in COLUMN_ALIASES.items()})
+
+# Number of rows validate_data checks for date/numeric convertibility
+VALIDATION_SAMPLE_SIZE = 1000
+
+def _resolve_columns(data):
+    """
+    Find the column in the data that best matches each standard column.
+    
+    The result depends only on the column names, so it is memoized per set of
+    names and validate_data and preprocess_data share a single resolution.
+    
+    Parameters:
+    - data: Pandas DataFrame containing the uploaded data
+    
+    Returns:
+    - found_columns: Dictionary mapping each standard name to the matching column (None if not found)
+    """
+    return dict(_resolve_column_names(tuple(data.columns)))
+
+@lru_cache(maxsize=32)
+def _resolve_column_names(columns):
+    """
+    Match a tuple of column names against the standard column aliases.
+    
+    Parameters:
+    - columns: Tuple of column names
+    
+    Returns:
+    - found_columns: Tuple of (standard name, matching column or None) pairs
+    """
+    names = pd.Index([col.lower().strip() for col in columns])
+    
+    # First check for exact matches: one lookup per column, keeping the most preferred alias
+    found_columns = dict.fromkeys(COLUMN_ALIASES)
+    best_rank = {}
+    for col, name in zip(columns, names):
+        if name in _ALIAS_TO_STD:
+            std_name, rank = _ALIAS_TO_STD[name]
+            if rank < best_rank.get(std_name, len(COLUMN_ALIASES[std_name])):
+                best_rank[std_name] = rank
+                found_columns[std_name] = col
+    
+    # Then check for partial matches (e.g., "product id" would match with "product"),
+    # scanning all column names once per standard column
+    for std_name, pattern in _PARTIAL_PATTERNS.items():
+        if found_columns[std_name] is not None:
+            continue
+        hits = np.asarray(names.str.contains(pattern))
+        if hits.any():
+            found_columns[std_name] = columns[hits.argmax()]
+    
+    return tuple(found_columns.items())
+
+def _scan_column(series):
+    """
+    Scan a numeric column for missing values and convertibility in one call.
+    
+    Parameters:
+    - series: Pandas Series from the uploaded data
+    
+    Returns:
+    - isna_mask: Boolean ndarray marking the missing values in the whole column
+    - numeric_data: Sample of the column coerced to numeric (preprocess_data does the full conversion)
+    """
+    isna_mask = series.isna().to_numpy()
+    sample = series.head(VALIDATION_SAMPLE_SIZE)
+    
+    # Columns pandas already parsed as numbers need no coercion
+    if pd.api.types.is_numeric_dtype(series):
+        numeric_data = sample
+    else:
+        numeric_data = pd.to_numeric(sample, errors='coerce')
+    return isna_mask, numeric_data
 
 def validate_data(data):
     """
@@ -17,63 +119,27 @@ def validate_data(data):
     if data.empty:
         return False, "The uploaded file contains no data."
     
-    # Display all columns for debugging
-    print(f"All columns in uploaded data: {list(data.columns)}")
+    # Log all columns for debugging (formatted only when DEBUG logging is enabled)
+    logger.debug("All columns in uploaded data: %s", data.columns)
     
     # Convert all column names to lowercase for easier matching
     data.columns = [col.lower().strip() for col in data.columns]
     
-    # Check for required columns (flexible with column naming)
-    required_columns = {
-        'date': ['date', 'datetime', 'day', 'sale_date', 'transaction_date', 'date of sale', 'sales date'],
-        'item': ['item', 'product', 'product_name', 'item_name', 'item_type', 'product type', 'goods', 'bakery item'],
-        'quantity': ['quantity', 'qty', 'units', 'units_sold', 'quantity_sold', 'count', 'number sold', 'amount sold'],
-        'revenue': ['revenue', 'sales', 'amount', 'sales_amount', 'income', 'sales revenue', 'total sales', 'price'],
-        'cogs': ['cogs', 'cost', 'cost_of_goods_sold', 'costs', 'expense', 'expenses', 'production cost', 'cost price']
-    }
-    
-    # Create a mapping from the actual column names to the standard names
-    column_mapping = {}
-    missing_columns = []
-    found_columns = {}
-    
-    # First check: Find matches for required columns
-    for std_name, possible_names in required_columns.items():
-        found = False
-        for col_name in possible_names:
-            # Check for exact match
-            if col_name in data.columns:
-                column_mapping[col_name] = std_name
-                found_columns[std_name] = col_name
-                found = True
-                break
-                
-            # Check for partial match (e.g., "product id" would match with "product")
-            for col in data.columns:
-                if col_name in col:
-                    column_mapping[col] = std_name
-                    found_columns[std_name] = col
-                    found = True
-                    break
-            
-            if found:
-                break
-        
-        if not found:
-            missing_columns.append(std_name)
+    # Find the best match for each required column (flexible with column naming)
+    found_columns = _resolve_columns(data)
+    missing_columns = [std_name for std_name, col in found_columns.items() if col is None]
     
     # If columns are missing, provide detailed feedback
     if missing_columns:
         feedback = f"Missing required columns: {', '.join(missing_columns)}\n\n"
         feedback += "Your data needs to have columns that represent:\n"
         for missing in missing_columns:
-            feedback += f"- {missing.capitalize()}: any of these names would work: {', '.join(required_columns[missing])}\n"
+            feedback += f"- {missing.capitalize()}: any of these names would work: {', '.join(COLUMN_ALIASES[missing])}\n"
         feedback += "\nAvailable columns in your data: " + ", ".join(data.columns)
         return False, feedback
     
-    # Print the mappings for debugging
-    print(f"Column mapping: {column_mapping}")
-    print(f"Found columns: {found_columns}")
+    # Log the mapping for debugging
+    logger.debug("Found columns: %s", found_columns)
     
     # Second check: Verify data types and handle conversion errors gracefully
     validation_errors = []
@@ -81,13 +147,14 @@ def validate_data(data):
     # Validate date column
     try:
         date_col = found_columns['date']
-        # Check for null values
-        if data[date_col].isnull().any():
-            null_count = data[date_col].isnull().sum()
+        # Check for null values (counted only if there are any)
+        null_mask = data[date_col].isna().to_numpy()
+        if null_mask.any():
+            null_count = int(null_mask.sum())
             validation_errors.append(f"Date column '{date_col}' contains {null_count} missing values.")
-        else:
-            # Try to convert to datetime
-            pd.to_datetime(data[date_col])
+        elif not pd.api.types.is_datetime64_any_dtype(data[date_col]):
+            # Try to convert a sample to datetime (preprocess_data does the full conversion)
+            pd.to_datetime(data[date_col].head(VALIDATION_SAMPLE_SIZE))
     except Exception as e:
         validation_errors.append(f"Error in date column '{date_col}': {str(e)}")
         validation_errors.append("The date column must contain valid dates (e.g., '2024-03-15', '03/15/2024').")
@@ -101,19 +168,22 @@ def validate_data(data):
     
     for col_name, actual_col in numeric_cols.items():
         try:
-            # Check for null values
-            if data[actual_col].isnull().any():
-                null_count = data[actual_col].isnull().sum()
-                validation_errors.append(f"{col_name.capitalize()} column '{actual_col}' contains {null_count} missing values.")
+            isna_mask, numeric_data = _scan_column(data[actual_col])
             
-            # Try to convert to numeric
-            numeric_data = pd.to_numeric(data[actual_col], errors='coerce')
+            # Check for null values (counted only if there are any)
+            if isna_mask.any():
+                null_count = int(isna_mask.sum())
+                validation_errors.append(f"{col_name.capitalize()} column '{actual_col}' contains {null_count} missing values.")
             
-            # Check if conversion introduced NaN values
-            if numeric_data.isnull().any():
-                non_numeric_count = numeric_data.isnull().sum()
-                non_numeric_rows = data.index[numeric_data.isnull()].tolist()[:5]  # Show first 5 problematic rows
-                validation_errors.append(f"{col_name.capitalize()} column '{actual_col}' contains {non_numeric_count} non-numeric values.")
+            # Check if conversion introduced NaN values (only the sample is converted)
+            invalid_mask = numeric_data.isna().to_numpy()
+            if invalid_mask.any():
+                non_numeric_count = int(invalid_mask.sum())
+                non_numeric_rows = numeric_data.index[invalid_mask].tolist()[:5]  # Show first 5 problematic rows
+                validation_errors.append(
+                    f"{col_name.capitalize()} column '{actual_col}' contains non-numeric values "
+                    f"({non_numeric_count} in the first {len(numeric_data)} rows)."
+                )
                 validation_errors.append(f"Problematic rows (first 5): {non_numeric_rows}")
         except Exception as e:
             validation_errors.append(f"Error in {col_name} column '{actual_col}': {str(e)}")
@@ -121,8 +191,9 @@ def validate_data(data):
     # Check item column for missing values
     try:
         item_col = found_columns['item']
-        if data[item_col].isnull().any():
-            null_count = data[item_col].isnull().sum()
+        null_mask = data[item_col].isna().to_numpy()
+        if null_mask.any():
+            null_count = int(null_mask.sum())
             validation_errors.append(f"Item column '{item_col}' contains {null_count} missing values.")
     except Exception as e:
         validation_errors.append(f"Error in item column '{item_col}': {str(e)}")
@@ -133,6 +204,13 @@ def validate_data(data):
         return False, error_message
     
     # All validation passed
+    # Formats are only checked on a sample; say so when rows were left unchecked
+    if len(data) > VALIDATION_SAMPLE_SIZE:
+        return True, (
+            "Data validation successful! Your data has all required columns, and the formats "
+            f"of the first {VALIDATION_SAMPLE_SIZE} of {len(data)} rows are valid. "
+            "Rows with invalid values further down are dropped or zero-filled during preprocessing."
+        )
     return True, "Data validation successful! Your data has all required columns and formats."
 
 def preprocess_data(data):
@@ -151,35 +229,10 @@ def preprocess_data(data):
     # Ensure column names are lowercase
     df.columns = [col.lower().strip() for col in df.columns]
     
-    # Expanded list of possible column names for better matching
-    column_patterns = {
-        'date': ['date', 'datetime', 'day', 'sale_date', 'transaction_date', 'date of sale', 'sales date'],
-        'item': ['item', 'product', 'product_name', 'item_name', 'item_type', 'product type', 'goods', 'bakery item'],
-        'quantity': ['quantity', 'qty', 'units', 'units_sold', 'quantity_sold', 'count', 'number sold', 'amount sold'],
-        'revenue': ['revenue', 'sales', 'amount', 'sales_amount', 'income', 'sales revenue', 'total sales', 'price'],
-        'cogs': ['cogs', 'cost', 'cost_of_goods_sold', 'costs', 'expense', 'expenses', 'production cost', 'cost price']
-    }
-    
     # Find the best match for each standard column
-    column_mapping = {}
+    column_mapping = {std_col: col for std_col, col in _resolve_columns(df).items() if col is not None}
     
-    for std_col, patterns in column_patterns.items():
-        # First check for exact matches
-        exact_matches = [col for col in df.columns if col in patterns]
-        if exact_matches:
-            column_mapping[std_col] = exact_matches[0]
-            continue
-            
-        # Then check for partial matches
-        for col in df.columns:
-            for pattern in patterns:
-                if pattern in col:
-                    column_mapping[std_col] = col
-                    break
-            if std_col in column_mapping:
-                break
-    
-    print(f"Found column mapping: {column_mapping}")
+    logger.debug("Found column mapping: %s", column_mapping)
     
     # Rename columns to standard names
     rename_dict = {v: k for k, v in column_mapping.items()}
@@ -193,14 +246,16 @@ def preprocess_data(data):
     
     # Convert data types with more robust error handling
     try:
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        # Columns that are already datetime64 need no parsing
+        if not pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = pd.to_datetime(df['date'], errors='coerce')
         # Drop rows with invalid dates
         invalid_dates = df['date'].isnull().sum()
         if invalid_dates > 0:
-            print(f"Dropping {invalid_dates} rows with invalid date values")
+            logger.warning("Dropping %d rows with invalid date values", invalid_dates)
             df.dropna(subset=['date'], inplace=True)
     except Exception as e:
-        print(f"Error converting date column: {str(e)}")
+        logger.warning("Error converting date column: %s", e)
         # Attempt more aggressive date parsing if standard method fails
         try:
             df['date'] = pd.to_datetime(df['date'], format='mixed', errors='coerce')
@@ -208,32 +263,65 @@ def preprocess_data(data):
         except:
             raise ValueError("Could not parse date column. Please ensure dates are in a standard format.")
     
-    # Convert numeric columns
-    for col in ['quantity', 'revenue', 'cogs']:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    # Handle missing values
-    df.dropna(subset=['date', 'item', 'quantity'], inplace=True)
-    df['revenue'].fillna(0, inplace=True)
-    df['cogs'].fillna(0, inplace=True)
-    
-    # Add derived features
-    df['profit'] = df['revenue'] - df['cogs']
-    df['profit_margin'] = (df['profit'] / df['revenue']) * 100
-    df['profit_margin'].replace([np.inf, -np.inf], np.nan, inplace=True)
-    df['profit_margin'].fillna(0, inplace=True)
+    # Convert numeric columns (float32 halves the memory held for the session)
+    df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce')
+    for col in ['revenue', 'cogs']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float32)
+    
+    # Handle missing values: drop rows without a date, item or quantity in one mask
+    mask = df['date'].notna() & df['item'].notna() & df['quantity'].notna()
+    dropped_rows = len(mask) - int(mask.sum())
+    if dropped_rows > 0:
+        logger.warning("Dropping %d rows with a missing item or non-numeric quantity", dropped_rows)
+    df = df.loc[mask].copy()
+    
+    # Whole-unit quantities are stored as int32; fractional ones (e.g. kg) as float32
+    quantity = df['quantity'].to_numpy()
+    if np.array_equal(quantity, np.floor(quantity)) and np.abs(quantity).max(initial=0) < 2**31:
+        df['quantity'] = quantity.astype(np.int32)
+    else:
+        df['quantity'] = quantity.astype(np.float32)
+    
+    # Store products as a categorical so grouping and filtering work on integer codes
+    df['item'] = df['item'].astype('category')
+    
+    # Add derived features in one pass over the raw arrays, treating missing
+    # revenue/cogs as zero and giving zero-revenue rows a margin of 0 instead of inf/NaN
+    revenue = df['revenue'].to_numpy()
+    cogs = df['cogs'].to_numpy()
+    for name, values in (('revenue', revenue), ('cogs', cogs)):
+        missing_count = int(np.isnan(values).sum())
+        if missing_count > 0:
+            logger.warning("Setting %d missing or non-numeric %s values to 0", missing_count, name)
+    revenue = np.where(np.isnan(revenue), 0.0, revenue)
+    cogs = np.where(np.isnan(cogs), 0.0, cogs)
+    profit = revenue - cogs
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margin = profit / revenue * 100
+    margin = np.where(np.isfinite(margin), margin, 0.0).astype(np.float32)
+
+    # Write the results back column by column (assign() would deep-copy the whole frame)
+    df['revenue'] = revenue
+    df['cogs'] = cogs
+    df['profit'] = profit
+    df['profit_margin'] = margin
     
     # Add time-based features
-    df['day_of_week'] = df['date'].dt.day_name()
-    df['month'] = df['date'].dt.month_name()
-    df['year'] = df['date'].dt.year
-    df['day'] = df['date'].dt.day
-    df['week_of_year'] = df['date'].dt.isocalendar().week
-    
-    # Sort by date
+    # Read every field from one DatetimeIndex; day and month names are stored as
+    # categoricals with a fixed calendar order
+    dti = pd.DatetimeIndex(df['date'])
+    df['day_of_week'] = pd.Categorical.from_codes(dti.dayofweek, categories=DAY_NAMES)
+    df['month'] = pd.Categorical.from_codes(dti.month - 1, categories=MONTH_NAMES)
+    df['year'] = dti.year.astype(np.int16)
+    df['day'] = dti.day.astype(np.uint8)
+    df['week_of_year'] = dti.isocalendar()['week'].to_numpy(dtype=np.uint8)
+    
+    # Sort by date and index by it so date ranges can be sliced with df.loc[start:end]
+    # (the index is left unnamed so groupby('date') still refers to the column)
     df.sort_values('date', inplace=True)
+    df.index = pd.DatetimeIndex(df['date'].to_numpy())
     
-    # Print summary for debugging
-    print(f"Preprocessed {len(df)} rows with columns: {list(df.columns)}")
+    # Log summary for debugging
+    logger.debug("Preprocessed %d rows with columns: %s", len(df), df.columns)
     
     return df
@@ -1,14 +1,25 @@
-import pandas as pd
 import numpy as np
-from prophet import Prophet
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
+# Serialized fitted models keyed by training data fingerprint and parameters
+# (least recently used entries are evicted first); Streamlit runs each session
+# in its own thread, so every cache access holds the lock
+_MODEL_CACHE = OrderedDict()
+_MODEL_CACHE_SIZE = 32
+_MODEL_CACHE_LOCK = threading.Lock()
+
 def train_forecast_model(data, seasonality_mode='additive', 
                          changepoint_prior_scale=0.05, 
                          seasonality_prior_scale=10.0):
     """
     Train a Prophet forecasting model on the provided data.
     
+    Fitted models are cached, so training again on the same data with the same
+    parameters returns a copy of the earlier fit instead of rerunning Stan.
+    
     Parameters:
     - data: Pandas DataFrame with at least 'date' and 'quantity' columns
     - seasonality_mode: 'additive' or 'multiplicative'
@@ -22,8 +33,23 @@ def train_forecast_model(data, seasonality_mode='additive',
     prophet_data = data[['date', 'quantity']].copy()
     prophet_data.columns = ['ds', 'y']
     
-    # Remove any duplicate dates by aggregating
-    prophet_data = prophet_data.groupby('ds')['y'].sum().reset_index()
+    # Remove any duplicate dates by aggregating (Stan expects float64 input)
+    prophet_data = prophet_data.groupby('ds')['y'].sum().astype(np.float64).reset_index()
+    
+    # Prophet (and cmdstanpy) is a slow import, so only load it when a model is trained
+    from prophet import Prophet
+    from prophet.serialize import model_from_json, model_to_json
+    
+    # Reuse an earlier fit if the data and parameters are unchanged
+    digest = hashlib.blake2b(prophet_data['ds'].to_numpy().tobytes())
+    digest.update(prophet_data['y'].to_numpy().tobytes())
+    cache_key = (digest.hexdigest(), seasonality_mode, changepoint_prior_scale, seasonality_prior_scale)
+    with _MODEL_CACHE_LOCK:
+        cached_model = _MODEL_CACHE.get(cache_key)
+        if cached_model is not None:
+            _MODEL_CACHE.move_to_end(cache_key)
+    if cached_model is not None:
+        return model_from_json(cached_model)
     
     # Configure and train Prophet model
     model = Prophet(
@@ -40,6 +66,14 @@ def train_forecast_model(data, seasonality_mode='additive',
     # Fit the model
     model.fit(prophet_data)
     
+    # Store a serialized copy so callers can never modify the cached model
+    serialized_model = model_to_json(model)
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE[cache_key] = serialized_model
+        _MODEL_CACHE.move_to_end(cache_key)
+        if len(_MODEL_CACHE) > _MODEL_CACHE_SIZE:
+            _MODEL_CACHE.popitem(last=False)
+    
     return model
 
 def make_predictions(model, periods=30):
@@ -61,33 +95,47 @@ def make_predictions(model, periods=30):
     
     return forecast
 
-def evaluate_forecast_accuracy(model, historical_data):
+def evaluate_forecast_accuracy(forecast, historical_data):
     """
     Evaluate the forecast model's accuracy on historical data.
     
     Parameters:
-    - model: Trained Prophet model
+    - forecast: DataFrame with forecast results from make_predictions (covers the historical dates)
     - historical_data: DataFrame with actual historical data
     
     Returns:
     - metrics: Dictionary of evaluation metrics
     """
-    # Convert data to Prophet format
-    prophet_data = historical_data[['date', 'quantity']].copy()
-    prophet_data.columns = ['ds', 'y']
-    
-    # Make predictions on the historical data
-    predictions = model.predict(pd.DataFrame({'ds': prophet_data['ds']}))
+    # Look up the in-sample predictions instead of running model.predict again
+    yhat_by_date = forecast.set_index('ds')['yhat']
+    historical_dates = historical_data['date'].to_numpy()
+    predicted = yhat_by_date.reindex(historical_dates).to_numpy()
+    
+    # A date the forecast doesn't cover would turn every metric into NaN
+    missing = np.isnan(predicted)
+    if missing.any():
+        missing_dates = np.datetime_as_string(historical_dates[missing], unit='D')
+        raise ValueError(
+            f"The forecast has no prediction for {int(missing.sum())} historical dates "
+            f"(first 5: {', '.join(missing_dates[:5])}). Make predictions covering the evaluated dates."
+        )
     
     # Calculate metrics
-    actual = prophet_data['y'].values
-    predicted = predictions['yhat'].values[:len(actual)]
+    actual = historical_data['quantity'].to_numpy(dtype=np.float64)
     
-    # Calculate error metrics
-    mse = np.mean((actual - predicted) ** 2)
+    # Calculate error metrics from a single residual array
+    diff = actual - predicted
+    mse = diff @ diff / diff.size
     rmse = np.sqrt(mse)
-    mae = np.mean(np.abs(actual - predicted))
-    mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+    abs_diff = np.abs(diff)
+    mae = abs_diff.mean()
+    
+    # MAPE skips days with zero actual sales instead of dividing by zero
+    nonzero = actual != 0
+    ratio = np.zeros_like(abs_diff)
+    np.divide(abs_diff, np.abs(actual), out=ratio, where=nonzero)
+    nonzero_count = np.count_nonzero(nonzero)
+    mape = ratio.sum() / nonzero_count * 100 if nonzero_count else np.nan
     
     # Return metrics as a dictionary
     metrics = {
@@ -1,6 +1,46 @@
 import pandas as pd
 import numpy as np
+import math
 from datetime import datetime, timedelta
+from utils.data_processing import DAY_NAMES
+
+def _compute_production_plan(yhat, yhat_lower, yhat_upper, factor):
+    """
+    Compute the numeric part of the production plan on plain arrays.
+    
+    Parameters:
+    - yhat, yhat_lower, yhat_upper: Forecast values and interval bounds as 1-D arrays
+    - factor: Multiplier applied to the forecast (1 + buffer percentage / 100)
+    
+    Returns:
+    - forecasted: Forecasted sales rounded to integers
+    - recommended, minimum, maximum: Buffered production quantities (rounded up)
+    - uncertainty: Width of the buffered production interval
+    - high_risk: Boolean mask of days with uncertainty above mean + 1.5*std
+    """
+    forecasted = np.rint(yhat).astype(np.int64)
+    
+    # Buffer and round up in place on one stacked array, then convert once
+    production = np.stack([yhat, yhat_lower, yhat_upper]).astype(np.float64, copy=False)
+    production *= factor
+    np.ceil(production, out=production)
+    recommended, minimum, maximum = production.astype(np.int64)
+    
+    # Identify risk days (days where the forecast confidence interval is wide);
+    # the standard deviation needs at least two days
+    uncertainty = maximum - minimum
+    n = uncertainty.size
+    if n > 1:
+        # Mean and sample std from one sum and one dot product (exact integer arithmetic)
+        total = int(uncertainty.sum())
+        sum_squares = int(uncertainty @ uncertainty)
+        avg_uncertainty = total / n
+        std_uncertainty = math.sqrt((n * sum_squares - total * total) / (n * (n - 1)))
+        high_risk = uncertainty > avg_uncertainty + 1.5 * std_uncertainty
+    else:
+        high_risk = np.zeros(n, dtype=bool)
+    
+    return forecasted, recommended, minimum, maximum, uncertainty, high_risk
 
 def generate_production_recommendations(forecast_data, product_name="All Products", buffer_percentage=10):
     """
@@ -14,46 +54,34 @@ def generate_production_recommendations(forecast_data, product_name="All Product
     Returns:
     - recommendations: Dictionary containing production recommendations
     """
-    # Create a copy of the forecast data
-    forecast = forecast_data.copy()
-    
-    # Filter only future dates
-    now = datetime.now()
-    future_forecast = forecast[forecast['ds'] >= now].copy()
-    
-    # Calculate recommended production quantities with buffer
-    future_forecast['recommended_production'] = np.ceil(future_forecast['yhat'] * (1 + buffer_percentage/100))
-    
-    # Calculate lower and upper bounds with buffer
-    future_forecast['min_production'] = np.ceil(future_forecast['yhat_lower'] * (1 + buffer_percentage/100))
-    future_forecast['max_production'] = np.ceil(future_forecast['yhat_upper'] * (1 + buffer_percentage/100))
-    
-    # Prepare daily production plan
-    daily_plan = future_forecast[['ds', 'yhat', 'recommended_production', 'min_production', 'max_production']].copy()
-    daily_plan.columns = ['Date', 'Forecasted Sales', 'Recommended Production', 'Minimum Production', 'Maximum Production']
-    
-    # Format date
-    daily_plan['Date'] = daily_plan['Date'].dt.strftime('%Y-%m-%d')
-    
-    # Round values to integers
-    daily_plan['Forecasted Sales'] = daily_plan['Forecasted Sales'].round().astype(int)
-    daily_plan['Recommended Production'] = daily_plan['Recommended Production'].astype(int)
-    daily_plan['Minimum Production'] = daily_plan['Minimum Production'].astype(int)
-    daily_plan['Maximum Production'] = daily_plan['Maximum Production'].astype(int)
-    
-    # Identify risk days (days where the forecast confidence interval is wide)
-    daily_plan['Uncertainty'] = daily_plan['Maximum Production'] - daily_plan['Minimum Production']
-    daily_plan['Risk Level'] = 'Normal'
-    
-    # Calculate the average uncertainty
-    avg_uncertainty = daily_plan['Uncertainty'].mean()
-    std_uncertainty = daily_plan['Uncertainty'].std()
+    # Filter only future dates with positions from the datetime64 array
+    # (no boolean Series, no index alignment, no intermediate frame)
+    ds = forecast_data['ds'].to_numpy()
+    future = np.flatnonzero(ds >= np.datetime64(datetime.now()))
+    
+    # Calculate production quantities, uncertainty and risk in one numeric pass
+    factor = 1 + buffer_percentage / 100
+    forecasted, recommended, minimum, maximum, uncertainty, high_risk = _compute_production_plan(
+        forecast_data['yhat'].to_numpy()[future],
+        forecast_data['yhat_lower'].to_numpy()[future],
+        forecast_data['yhat_upper'].to_numpy()[future],
+        factor
+    )
     
-    # Mark high risk days (uncertainty > avg + 1.5*std)
-    daily_plan.loc[daily_plan['Uncertainty'] > (avg_uncertainty + 1.5 * std_uncertainty), 'Risk Level'] = 'High'
+    # Prepare daily production plan (dates stay datetime64 until the plan is returned)
+    dates = ds[future]
+    daily_plan = pd.DataFrame({
+        'Date': dates,
+        'Forecasted Sales': forecasted,
+        'Recommended Production': recommended,
+        'Minimum Production': minimum,
+        'Maximum Production': maximum,
+        'Uncertainty': uncertainty,
+        'Risk Level': np.where(high_risk, 'High', 'Normal')
+    }, index=forecast_data.index[future])
     
     # Extract high risk days
-    high_risk_days = daily_plan[daily_plan['Risk Level'] == 'High'].copy()
+    high_risk_days = daily_plan.iloc[np.flatnonzero(high_risk)]
     
     # Generate risk assessment text
     if len(high_risk_days) > 0:
@@ -74,19 +102,26 @@ def generate_production_recommendations(forecast_data, product_name="All Product
         peak_production = 0
         peak_production_date = "N/A"
     else:
-        avg_daily_production = daily_plan['Recommended Production'].mean()
-        total_production = daily_plan['Recommended Production'].sum()
-        peak_production = daily_plan['Recommended Production'].max()
-        peak_production_date = daily_plan.loc[daily_plan['Recommended Production'].idxmax(), 'Date']
+        # All summary stats come from the recommended production array
+        peak_idx = int(recommended.argmax())
+        avg_daily_production = float(recommended.mean())
+        total_production = int(recommended.sum())
+        peak_production = int(recommended[peak_idx])
+        peak_production_date = str(np.datetime_as_string(dates[peak_idx], unit='D'))
     
     # Generate additional recommendations
     additional_recommendations = generate_additional_recommendations(
-        daily_plan, 
+        recommended,
+        dates,
         product_name,
         avg_daily_production,
         peak_production
     )
     
+    # Format dates as YYYY-MM-DD for display (numpy's ISO day format, no per-row strftime)
+    daily_plan['Date'] = np.datetime_as_string(daily_plan['Date'].to_numpy(), unit='D')
+    high_risk_days = high_risk_days.assign(Date=np.datetime_as_string(high_risk_days['Date'].to_numpy(), unit='D'))
+    
     # Compile all recommendations into a dictionary
     recommendations = {
         'daily_plan': daily_plan[['Date', 'Forecasted Sales', 'Recommended Production', 'Risk Level']],
@@ -102,12 +137,13 @@ def generate_production_recommendations(forecast_data, product_name="All Product
     
     return recommendations
 
-def generate_additional_recommendations(daily_plan, product_name, avg_production, peak_production):
+def generate_additional_recommendations(rec, dt, product_name, avg_production, peak_production):
     """
     Generate additional context-specific recommendations based on the forecast.
     
     Parameters:
-    - daily_plan: DataFrame with daily production recommendations
+    - rec: Array of recommended daily production quantities
+    - dt: datetime64 array with the date of each entry in rec
     - product_name: Name of the product being forecasted
     - avg_production: Average daily production
     - peak_production: Peak daily production
@@ -115,89 +151,101 @@ def generate_additional_recommendations(daily_plan, product_name, avg_production
     Returns:
     - recommendations_text: String with additional recommendations
     """
-    # Generate recommendations text
-    recommendations = []
-    
-    # Check if dataframe is empty to prevent ValueError
-    if daily_plan.empty:
-        # Default recommendations for empty data
-        recommendations.append("**No Production Data Available**")
-        recommendations.append("- No forecast data is available for the selected product and time range.")
-        recommendations.append("- Try selecting a different product or extending the forecast period.")
-        
+    # Check if there is any data to prevent ValueError
+    if rec.size == 0:
         # Set dummy values for highest/lowest day
         highest_day = "Not available"
         lowest_day = "Not available"
-        # Set empty significant_changes
-        significant_changes = pd.DataFrame()
+        # No significant changes without data
+        significant_changes = 0
     else:
-        # Calculate day-to-day variability
-        daily_plan['Prev_Production'] = daily_plan['Recommended Production'].shift(1)
-        daily_plan['Daily_Change'] = daily_plan['Recommended Production'] - daily_plan['Prev_Production']
-        daily_plan['Percent_Change'] = (daily_plan['Daily_Change'] / daily_plan['Prev_Production']) * 100
-        
-        # Drop NaN values (first row will have NaN for change calculation)
-        daily_plan.dropna(subset=['Percent_Change'], inplace=True)
+        # Calculate day-to-day variability; a rise from zero gives inf and
+        # counts as significant, 0 -> 0 gives NaN and doesn't
+        previous = rec[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent_change = (rec[1:] - previous) / previous * 100
         
-        # Find days with significant changes (more than 20%)
-        significant_changes = daily_plan[abs(daily_plan['Percent_Change']) > 20]
+        # Count days with significant changes (more than 20%)
+        significant_changes = int(np.count_nonzero(np.abs(percent_change) > 20))
         
-        # Handle empty dataframe after dropping NaNs
-        if daily_plan.empty:
-            highest_day = "Not available"
-            lowest_day = "Not available"
-            significant_changes = pd.DataFrame()
-        else:
-            # Find the weekly pattern (which days have higher production)
-            daily_plan['Day_Name'] = pd.to_datetime(daily_plan['Date']).dt.day_name()
-            weekday_avg = daily_plan.groupby('Day_Name')['Recommended Production'].mean()
-            
-            # Handle empty groupby result
-            if len(weekday_avg) == 0:
-                highest_day = "Not available"
-                lowest_day = "Not available"
-            else:
-                highest_day = weekday_avg.idxmax()
-                lowest_day = weekday_avg.idxmin()
+        # Find the weekly pattern (which days have higher production) by
+        # averaging over the 7 weekday bins, ignoring days that don't occur
+        # (day 0 of the epoch, 1970-01-01, was a Thursday)
+        weekday = (dt.astype('datetime64[D]').astype(np.int64) + 3) % 7
+        totals = np.bincount(weekday, weights=rec, minlength=7)
+        counts = np.bincount(weekday, minlength=7)
+        weekday_avg = totals / np.maximum(counts, 1)
+        highest_day = DAY_NAMES[int(np.argmax(np.where(counts > 0, weekday_avg, -np.inf)))]
+        lowest_day = DAY_NAMES[int(np.argmin(np.where(counts > 0, weekday_avg, np.inf)))]
+    
+    # Combine all recommendations (only the sections that apply are generated)
+    recommendations_text = "\n".join(_recommendation_lines(
+        rec.size > 0,
+        product_name,
+        highest_day,
+        lowest_day,
+        significant_changes,
+        avg_production,
+        peak_production
+    ))
+    
+    return recommendations_text
+
+def _recommendation_lines(has_data, product_name, highest_day, lowest_day,
+                          significant_changes, avg_production, peak_production):
+    """
+    Yield the lines of the additional recommendations text in order.
+    
+    Parameters:
+    - has_data: Whether the forecast contains any future days
+    - product_name: Name of the product being forecasted
+    - highest_day, lowest_day: Weekdays with the highest and lowest average production
+    - significant_changes: Number of day-to-day production changes above 20%
+    - avg_production: Average daily production
+    - peak_production: Peak daily production
+    
+    Returns:
+    - Generator of text lines
+    """
+    # Default recommendations for empty data
+    if not has_data:
+        yield "**No Production Data Available**"
+        yield "- No forecast data is available for the selected product and time range."
+        yield "- Try selecting a different product or extending the forecast period."
     
     # Product specific recommendation
     if product_name != "All Products":
-        recommendations.append(f"**Product Specific ({product_name}):**")
+        yield f"**Product Specific ({product_name}):**"
     else:
-        recommendations.append("**Overall Production:**")
+        yield "**Overall Production:**"
     
     # Weekly pattern insights
-    recommendations.append(f"- {highest_day}s show the highest average production requirements")
-    recommendations.append(f"- {lowest_day}s show the lowest average production requirements")
-    recommendations.append(f"- Consider adjusting staff scheduling to match this pattern")
+    yield f"- {highest_day}s show the highest average production requirements"
+    yield f"- {lowest_day}s show the lowest average production requirements"
+    yield "- Consider adjusting staff scheduling to match this pattern"
     
     # Production variability insights
-    if len(significant_changes) > 0:
-        recommendations.append("\n**Production Variability:**")
-        recommendations.append(f"- {len(significant_changes)} days show significant day-to-day production changes (>20%)")
-        recommendations.append("- Consider preparing shelf-stable ingredients in advance for these fluctuations")
-        recommendations.append("- Plan staff scheduling carefully around these dates")
+    if significant_changes > 0:
+        yield "\n**Production Variability:**"
+        yield f"- {significant_changes} days show significant day-to-day production changes (>20%)"
+        yield "- Consider preparing shelf-stable ingredients in advance for these fluctuations"
+        yield "- Plan staff scheduling carefully around these dates"
     
     # Capacity planning insights
-    recommendations.append("\n**Capacity Planning:**")
-    recommendations.append(f"- Peak production day requires {peak_production} units")
+    yield "\n**Capacity Planning:**"
+    yield f"- Peak production day requires {peak_production} units"
     
     # Avoid division by zero error
     if avg_production > 0:
         percent_higher = ((peak_production/avg_production)-1)*100
-        recommendations.append(f"- This is {percent_higher:.1f}% higher than the average daily production")
+        yield f"- This is {percent_higher:.1f}% higher than the average daily production"
     else:
-        recommendations.append("- No percentage calculation possible (average production is zero)")
-    recommendations.append("- Ensure that equipment and staff capacity can handle peak days")
-    recommendations.append("- Consider pre-producing stable components if peak exceeds production capacity")
+        yield "- No percentage calculation possible (average production is zero)"
+    yield "- Ensure that equipment and staff capacity can handle peak days"
+    yield "- Consider pre-producing stable components if peak exceeds production capacity"
     
     # Inventory management
-    recommendations.append("\n**Inventory Management:**")
-    recommendations.append("- Review ingredient inventory levels based on the forecast")
-    recommendations.append("- Schedule deliveries to align with production peaks")
-    recommendations.append("- Consider JIT (Just-In-Time) ordering for perishable ingredients")
-    
-    # Combine all recommendations
-    recommendations_text = "\n".join(recommendations)
-    
-    return recommendations_text
+    yield "\n**Inventory Management:**"
+    yield "- Review ingredient inventory levels based on the forecast"
+    yield "- Schedule deliveries to align with production peaks"
+    yield "- Consider JIT (Just-In-Time) ordering for perishable ingredients"
@@ -4,6 +4,55 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
+from utils.data_processing import DAY_NAMES, MONTH_NAMES
+
+# Range selector buttons for date axes (the same on every call, so built once)
+_RANGESELECTOR_BUTTONS = (
+    dict(count=7, label="1w", step="day", stepmode="backward"),
+    dict(count=1, label="1m", step="month", stepmode="backward"),
+    dict(count=3, label="3m", step="month", stepmode="backward"),
+    dict(step="all")
+)
+_RANGESELECTOR = dict(buttons=_RANGESELECTOR_BUTTONS)
+
+def _aggregate_codes(codes, values, size, mean=True):
+    """
+    Sum or average values per integer code with weighted bincounts.
+    
+    Parameters:
+    - codes: Integer array of group codes in [0, size) (negative codes are dropped)
+    - values: float64 array aligned with codes (NaN values are skipped)
+    - size: Number of groups
+    - mean: Return the average per group instead of the sum
+    
+    Returns:
+    - result: Sum or average of values for each group (NaN for empty groups when averaging)
+    """
+    valid = (codes >= 0) & ~np.isnan(values)
+    if not valid.all():
+        codes = codes[valid]
+        values = values[valid]
+    result = np.bincount(codes, weights=values, minlength=size)
+    if mean:
+        counts = np.bincount(codes, minlength=size)
+        result = np.divide(result, counts, out=np.full(size, np.nan), where=counts > 0)
+    return result
+
+def _aggregate_by(keys, values, mean=True):
+    """
+    Sum or average values per distinct key with weighted bincounts.
+    
+    Parameters:
+    - keys: Series to group by (missing keys are dropped)
+    - values: float64 array aligned with keys (NaN values are skipped)
+    - mean: Return the average per key instead of the sum
+    
+    Returns:
+    - uniques: Sorted distinct keys
+    - result: Sum or average of values for each key
+    """
+    codes, uniques = pd.factorize(keys, sort=True)
+    return uniques, _aggregate_codes(codes, values, len(uniques), mean)
 
 def plot_sales_trends(data):
     """
@@ -15,12 +64,13 @@ def plot_sales_trends(data):
     Returns:
     - fig: Plotly figure object
     """
-    # Aggregate data by date
-    daily_sales = data.groupby('date')['revenue'].sum().reset_index()
+    # Aggregate data by date (missing revenue is skipped, like groupby's sum)
+    revenue = data['revenue'].to_numpy(dtype=np.float64, na_value=np.nan)
+    dates, daily_revenue = _aggregate_by(data['date'], revenue, mean=False)
     
     # Create figure
     fig = px.line(
-        daily_sales, 
+        pd.DataFrame({'date': dates, 'revenue': daily_revenue}), 
         x='date', 
         y='revenue',
         labels={'date': 'Date', 'revenue': 'Revenue ($)'},
@@ -37,14 +87,7 @@ def plot_sales_trends(data):
     # Add range slider
     fig.update_xaxes(
         rangeslider_visible=True,
-        rangeselector=dict(
-            buttons=list([
-                dict(count=7, label="1w", step="day", stepmode="backward"),
-                dict(count=1, label="1m", step="month", stepmode="backward"),
-                dict(count=3, label="3m", step="month", stepmode="backward"),
-                dict(step="all")
-            ])
-        )
+        rangeselector=_RANGESELECTOR
     )
     
     return fig
@@ -59,17 +102,19 @@ def plot_product_distribution(data):
     Returns:
     - fig: Plotly figure object
     """
-    # Aggregate by product
-    product_sales = data.groupby('item')['quantity'].sum().reset_index()
-    product_sales = product_sales.sort_values('quantity', ascending=False)
+    # Aggregate by product (missing items and quantities are skipped, like groupby's sum)
+    quantity = data['quantity'].to_numpy(dtype=np.float64, na_value=np.nan)
+    items, totals = _aggregate_by(data['item'], quantity, mean=False)
     
-    # Limit to top 10 products for better visualization
-    if len(product_sales) > 10:
-        top_products = product_sales.head(10)
+    # Limit to top 10 products for better visualization; only those 10 are sorted
+    if len(totals) > 10:
+        top = np.argpartition(-totals, 10)[:10]
         fig_title = 'Top 10 Products by Quantity Sold'
     else:
-        top_products = product_sales
+        top = np.arange(len(totals))
         fig_title = 'Products by Quantity Sold'
+    top = top[np.argsort(-totals[top], kind='stable')]
+    top_products = pd.DataFrame({'item': np.asarray(items)[top], 'quantity': totals[top]})
     
     # Create figure
     fig = px.bar(
@@ -104,34 +149,29 @@ def plot_sales_forecast(historical_data, forecast_data, product_name="All Produc
     Returns:
     - fig: Plotly figure object
     """
-    # Prepare historical data
+    # Prepare historical data (the columns are only read, so pick them without copying)
     if 'date' in historical_data.columns:
-        historical = historical_data[['date', 'quantity']].copy()
-        historical.columns = ['ds', 'y']
+        historical_dates = historical_data['date']
+        historical_values = historical_data['quantity']
     else:
-        historical = historical_data[['ds', 'y']].copy()
-    
-    # Create a combined dataframe with historical and forecasted data
-    historical['type'] = 'Historical'
+        historical_dates = historical_data['ds']
+        historical_values = historical_data['y']
     
-    # For forecasted data, extract only future dates
-    last_historical_date = historical['ds'].max()
-    future_forecast = forecast_data[forecast_data['ds'] > last_historical_date].copy()
-    future_forecast['type'] = 'Forecast'
-    
-    # Combine dataframes
-    forecast_plot_data = pd.concat([
-        historical,
-        future_forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper', 'type']]
-    ])
+    # For forecasted data, extract only future dates as positions into the datetime64 array
+    last_historical_date = historical_dates.max().to_datetime64()
+    forecast_dates = forecast_data['ds'].to_numpy()
+    future = np.flatnonzero(forecast_dates > last_historical_date)
+    forecast_dates = forecast_dates[future]
+    yhat_upper = forecast_data['yhat_upper'].to_numpy()[future]
+    yhat_lower = forecast_data['yhat_lower'].to_numpy()[future]
     
     # Create figure
     fig = go.Figure()
     
     # Add historical data
     fig.add_trace(go.Scatter(
-        x=historical['ds'],
-        y=historical['y'],
+        x=historical_dates,
+        y=historical_values,
         mode='lines+markers',
         name='Historical Sales',
         line=dict(color='royalblue')
@@ -139,17 +179,17 @@ def plot_sales_forecast(historical_data, forecast_data, product_name="All Produc
     
     # Add forecasted values
     fig.add_trace(go.Scatter(
-        x=future_forecast['ds'],
-        y=future_forecast['yhat'],
+        x=forecast_dates,
+        y=forecast_data['yhat'].to_numpy()[future],
         mode='lines',
         name='Forecast',
         line=dict(color='firebrick')
     ))
     
-    # Add prediction intervals
+    # Add prediction intervals (upper bound forward, lower bound back; reversed arrays are views)
     fig.add_trace(go.Scatter(
-        x=pd.concat([future_forecast['ds'], future_forecast['ds'][::-1]]),
-        y=pd.concat([future_forecast['yhat_upper'], future_forecast['yhat_lower'][::-1]]),
+        x=np.concatenate([forecast_dates, forecast_dates[::-1]]),
+        y=np.concatenate([yhat_upper, yhat_lower[::-1]]),
         fill='toself',
         fillcolor='rgba(231,107,243,0.2)',
         line=dict(color='rgba(255,255,255,0)'),
@@ -194,28 +234,31 @@ def plot_seasonality(data):
     # Check if we have hourly data
     has_hourly_data = 'hour' in data.columns
     
-    # 1. Sales by day of week
-    day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    weekly_sales = data.groupby('day_of_week')['quantity'].mean().reindex(day_order).reset_index()
+    # Every panel aggregates the same quantity array, so convert it only once
+    quantity = data['quantity'].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    # 1. Sales by day of week (codes follow the Monday..Sunday display order,
+    # unknown names get -1 and are left out)
+    day_codes = pd.Categorical(data['day_of_week'], categories=DAY_NAMES).codes
+    weekly_sales = _aggregate_codes(day_codes, quantity, len(DAY_NAMES))
     
     fig.add_trace(
         go.Bar(
-            x=weekly_sales['day_of_week'],
-            y=weekly_sales['quantity'],
+            x=DAY_NAMES,
+            y=weekly_sales,
             marker_color='royalblue'
         ),
         row=1, col=1
     )
     
     # 2. Monthly sales pattern
-    month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                   'July', 'August', 'September', 'October', 'November', 'December']
-    monthly_sales = data.groupby('month')['quantity'].mean().reindex(month_order).reset_index()
+    month_codes = pd.Categorical(data['month'], categories=MONTH_NAMES).codes
+    monthly_sales = _aggregate_codes(month_codes, quantity, len(MONTH_NAMES))
     
     fig.add_trace(
         go.Bar(
-            x=monthly_sales['month'],
-            y=monthly_sales['quantity'],
+            x=MONTH_NAMES,
+            y=monthly_sales,
             marker_color='firebrick'
         ),
         row=1, col=2
@@ -223,12 +266,12 @@ def plot_seasonality(data):
     
     # 3. Hourly sales pattern (if available)
     if has_hourly_data:
-        hourly_sales = data.groupby('hour')['quantity'].mean().reset_index()
+        hours, hourly_sales = _aggregate_by(data['hour'], quantity)
         
         fig.add_trace(
             go.Scatter(
-                x=hourly_sales['hour'],
-                y=hourly_sales['quantity'],
+                x=hours,
+                y=hourly_sales,
                 mode='lines+markers',
                 line=dict(color='green')
             ),
@@ -236,12 +279,12 @@ def plot_seasonality(data):
         )
     else:
         # Alternative: Sales trend over the analysis period
-        daily_trend = data.groupby('date')['quantity'].sum().reset_index()
+        trend_dates, daily_trend = _aggregate_by(data['date'], quantity, mean=False)
         
         fig.add_trace(
             go.Scatter(
-                x=daily_trend['date'],
-                y=daily_trend['quantity'],
+                x=trend_dates,
+                y=daily_trend,
                 mode='lines',
                 line=dict(color='green')
             ),
@@ -250,12 +293,12 @@ def plot_seasonality(data):
         fig.update_xaxes(title_text="Date", row=2, col=1)
     
     # 4. Sales by day of month
-    day_of_month = data.groupby('day')['quantity'].mean().reset_index()
+    month_days, day_of_month = _aggregate_by(data['day'], quantity)
     
     fig.add_trace(
         go.Scatter(
-            x=day_of_month['day'],
-            y=day_of_month['quantity'],
+            x=month_days,
+            y=day_of_month,
             mode='lines+markers',
             line=dict(color='purple')
         ),